@@ -6,138 +6,356 @@ Install: pip3 install matplotlib pandas
 """
 
 import argparse
-import pandas as pd
-import matplotlib.pyplot as plt
+import contextlib
+import functools
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 
-def plot_sysbench(csv_file, output_dir):
-    """Plot sysbench results"""
-    df = pd.read_csv(csv_file)
+# pandas, numpy, matplotlib and Pillow are imported inside the functions
+# that use them, so argument parsing and --help stay fast
+
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """Import pyplot on first use, configured for headless PNG output"""
+    import matplotlib
+    matplotlib.use('Agg')  # Output is PNG only; skip GUI backend setup
+    import matplotlib.pyplot as plt
+
+    plt.ioff()
+    # Matplotlib's built-in 'fast' style: path simplification and Agg
+    # chunking, visually identical for these small line charts
+    plt.style.use('fast')
+    return plt
+
+# Screen-resolution PNGs with fast zlib compression; PNG encoding dominates
+# runtime at dpi=300 with the default compression level
+PNG_DPI = 120
+PNG_COMPRESS_LEVEL = 1
+
+# Line styling shared by every per-engine series; sysbench charts keep the
+# default marker size
+LINE_STYLE = {'marker': 'o', 'linewidth': 2, 'markersize': 8}
+SYSBENCH_LINE_STYLE = {'marker': 'o', 'linewidth': 2}
+
+# Legend labels for both engine naming conventions
+ENGINE_LABELS = {
+    'vanilla-innodb': 'Vanilla InnoDB',
+    'percona-innodb': 'Percona InnoDB',
+    'percona-myrocks': 'Percona MyRocks',
+    'innodb': 'InnoDB',
+    'myrocks': 'MyRocks'
+}
+
+def engine_styles(engines, base_style, labels=None):
+    """Build one ax.plot kwargs dict per engine, labelled for the legend"""
+    labels = labels or {}
+    return {engine: {**base_style, 'label': labels.get(engine, engine.upper())}
+            for engine in engines}
+
+# Columns read by any plot; explicit dtypes skip pandas' type inference.
+# Columns absent from a given benchmark's CSV are simply not loaded.
+CSV_DTYPES = {
+    'engine': 'category',
+    'workload': 'category',
+    'threads': 'int32',
+    'tps': 'float32',
+    'tpmC': 'float32',
+    'latency_avg': 'float32',
+    'latency_95': 'float32',
+}
+
+def load_results(csv_file):
+    """Read merged_results.csv once, keeping only the plotted columns
+
+    Rows are sorted by (engine, threads) so every per-engine slice is
+    already in plotting order. Engines keep their CSV order, which fixes
+    each engine's colour and legend position.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_file, dtype=CSV_DTYPES,
+                     usecols=lambda c: c in CSV_DTYPES)
+    if 'engine' in df.columns:
+        # Categoricals sort by category order, which pandas infers
+        # alphabetically; use first-appearance order instead
+        df['engine'] = df['engine'].cat.reorder_categories(
+            df['engine'].unique().tolist())
+    df.sort_values(['engine', 'threads'], inplace=True, kind='mergesort')
+    return df
+
+def needs_rebuild(path, csv_mtime):
+    """Return True unless path is at least as new as the CSV (csv_mtime)
+
+    csv_mtime of None disables incremental mode and always rebuilds.
+    """
+    return csv_mtime is None or not path.exists() or path.stat().st_mtime < csv_mtime
+
+def engine_arrays(df):
+    """Split df into per-engine NumPy column arrays
+
+    Returns {engine: {column: ndarray}} so every chart indexes the same
+    arrays instead of re-filtering the DataFrame. Arrays keep df's row
+    order, which load_results() sorts by threads. observed=True drops
+    engine categories without rows, so callers never plot an empty series.
+    """
+    return {engine: {col: group[col].to_numpy() for col in group.columns}
+            for engine, group in df.groupby('engine', sort=False, observed=True)}
+
+@contextlib.contextmanager
+def _figure(**kwargs):
+    """plt.subplots() as a context manager that always closes the figure"""
+    plt = _pyplot()
+    fig, axes = plt.subplots(**kwargs)
+    try:
+        yield fig, axes
+    finally:
+        plt.close(fig)
+
+def _rasterize(fig):
+    """Draw fig with Agg and return a copy of its RGBA buffer"""
+    import numpy as np
+
+    fig.canvas.draw()
+    return np.array(fig.canvas.buffer_rgba())
+
+def _encode_png(rgba, path):
+    import matplotlib
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+
+    # Same pHYs and Software metadata fig.savefig() would write
+    info = PngInfo()
+    info.add_text('Software', f'Matplotlib version{matplotlib.__version__}, '
+                              'https://matplotlib.org/')
+    Image.fromarray(rgba, 'RGBA').save(path, optimize=False,
+                                       compress_level=PNG_COMPRESS_LEVEL,
+                                       dpi=(PNG_DPI, PNG_DPI), pnginfo=info)
+
+def save_png(fig, path):
+    """Write fig to path as a PNG; create fig with dpi=PNG_DPI"""
+    _encode_png(_rasterize(fig), path)
+
+def save_png_async(encoder, fig, path):
+    """Rasterize fig with Agg now and PNG-encode it on the encoder pool
+
+    The RGBA buffer is copied, so fig can be cleared and redrawn while the
+    encode runs (Pillow releases the GIL during zlib compression). Create
+    fig with dpi=PNG_DPI, as for save_png().
+    """
+    return encoder.submit(_encode_png, _rasterize(fig), path)
+
+def _stale_charts(paths, csv_mtime):
+    """Subset of {chart: path} that needs rendering, in the same order"""
+    return {chart: path for chart, path in paths.items()
+            if needs_rebuild(path, csv_mtime)}
+
+def _speedup_engines(engines):
+    """Return (innodb_engine, myrocks_engine) for a pairwise comparison
+
+    Either is None unless exactly one InnoDB and one MyRocks engine are
+    present.
+    """
+    innodb_engine = None
+    myrocks_engine = None
+
+    if len(engines) == 2:
+        for engine in engines:
+            if 'innodb' in engine:
+                innodb_engine = engine
+            elif 'myrocks' in engine:
+                myrocks_engine = engine
 
-    workloads = df['workload'].unique()
+    return innodb_engine, myrocks_engine
 
-    for workload in workloads:
-        workload_df = df[df['workload'] == workload]
+def _workload_paths(output_dir, workload):
+    """Output PNG paths for one sysbench workload, keyed by chart"""
+    return {
+        'tps': output_dir / f"{workload}_tps.png",
+        'latency': output_dir / f"{workload}_latency.png",
+    }
 
-        # Plot TPS
-        fig, ax = plt.subplots(figsize=(12, 6))
+def _render_workload(engine_dfs, workload, output_dir, csv_mtime=None):
+    """Render the TPS and latency charts for one sysbench workload
+
+    engine_dfs maps engine name to that engine's rows for this workload;
+    output_dir is a Path. Charts newer than csv_mtime are skipped.
+    Returns False without writing anything when engine_dfs is empty.
+    """
+    if not engine_dfs:
+        return False
 
-        for engine in ['innodb', 'myrocks']:
-            engine_df = workload_df[workload_df['engine'] == engine]
-            ax.plot(engine_df['threads'], engine_df['tps'],
-                   marker='o', label=engine.upper(), linewidth=2)
+    paths = _workload_paths(output_dir, workload)
+    styles = engine_styles(engine_dfs, SYSBENCH_LINE_STYLE, ENGINE_LABELS)
 
-        ax.set_xlabel('Threads', fontsize=12)
-        ax.set_ylabel('Transactions Per Second (TPS)', fontsize=12)
-        ax.set_title(f'Sysbench {workload} - Throughput Comparison', fontsize=14)
-        ax.legend(fontsize=11)
-        ax.grid(True, alpha=0.3)
-        ax.set_xscale('log', base=2)
+    # Reuse one figure for both charts
+    with _figure(figsize=(12, 6), dpi=PNG_DPI, constrained_layout=True) as (fig, ax):
+        # Plot TPS
+        if needs_rebuild(paths['tps'], csv_mtime):
+            for engine, engine_df in engine_dfs.items():
+                x = engine_df['threads'].to_numpy()
+                y = engine_df['tps'].to_numpy()
+                ax.plot(x, y, **styles[engine])
+
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('Transactions Per Second (TPS)', fontsize=12)
+            ax.set_title(f'Sysbench {workload} - Throughput Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
 
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/{workload}_tps.png", dpi=300)
-        plt.close()
+            save_png(fig, paths['tps'])
 
         # Plot Latency
-        fig, ax = plt.subplots(figsize=(12, 6))
+        if needs_rebuild(paths['latency'], csv_mtime):
+            ax.cla()
 
-        for engine in ['innodb', 'myrocks']:
-            engine_df = workload_df[workload_df['engine'] == engine]
-            ax.plot(engine_df['threads'], engine_df['latency_avg'],
-                   marker='o', label=engine.upper(), linewidth=2)
+            for engine, engine_df in engine_dfs.items():
+                x = engine_df['threads'].to_numpy()
+                y = engine_df['latency_avg'].to_numpy()
+                ax.plot(x, y, **styles[engine])
 
-        ax.set_xlabel('Threads', fontsize=12)
-        ax.set_ylabel('Average Latency (ms)', fontsize=12)
-        ax.set_title(f'Sysbench {workload} - Latency Comparison', fontsize=14)
-        ax.legend(fontsize=11)
-        ax.grid(True, alpha=0.3)
-        ax.set_xscale('log', base=2)
-        ax.set_yscale('log')
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('Average Latency (ms)', fontsize=12)
+            ax.set_title(f'Sysbench {workload} - Latency Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
+            ax.set_yscale('log')
 
-        plt.tight_layout()
-        plt.savefig(f"{output_dir}/{workload}_latency.png", dpi=300)
-        plt.close()
+            save_png(fig, paths['latency'])
 
-        print(f"Created plots for {workload}")
+    return True
 
-    # Create summary comparison plot
-    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+def plot_sysbench(df, output_dir, csv_mtime=None):
+    """Plot sysbench results"""
+    workloads = df['workload'].unique()
+    engines = df['engine'].unique()
 
-    for idx, workload in enumerate(workloads[:3]):  # Plot first 3 workloads
-        workload_df = df[df['workload'] == workload]
+    # One hash pass over (workload, engine) instead of a mask scan per plot
+    groups = df.groupby(['workload', 'engine'], sort=False, observed=True)
 
-        for engine in ['innodb', 'myrocks']:
-            engine_df = workload_df[workload_df['engine'] == engine]
-            axes[idx].plot(engine_df['threads'], engine_df['tps'],
-                          marker='o', label=engine.upper(), linewidth=2)
+    # Engines missing from a workload are left out rather than plotted empty
+    def workload_engine_dfs(workload):
+        return {engine: groups.get_group((workload, engine))
+                for engine in engines
+                if (workload, engine) in groups.groups}
 
-        axes[idx].set_xlabel('Threads', fontsize=10)
-        axes[idx].set_ylabel('TPS', fontsize=10)
-        axes[idx].set_title(f'{workload}', fontsize=11)
-        axes[idx].legend(fontsize=9)
-        axes[idx].grid(True, alpha=0.3)
-        axes[idx].set_xscale('log', base=2)
+    stale = [workload for workload in workloads
+             if any(needs_rebuild(path, csv_mtime)
+                    for path in _workload_paths(output_dir, workload).values())]
+    for workload in workloads:
+        if workload not in stale:
+            print(f"Plots for {workload} are up to date")
+
+    # Per-workload charts are independent; render them in parallel.
+    # Each worker only receives its own workload's rows.
+    futures = {}
+    if stale:
+        # Import matplotlib before forking so workers inherit it
+        _pyplot()
+        max_workers = min(os.cpu_count() or 1, len(stale))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(_render_workload, workload_engine_dfs(workload),
+                                workload, output_dir, csv_mtime): workload
+                for workload in stale
+            }
+            wait(futures)
+
+    for future, workload in futures.items():
+        if future.result():  # Re-raises any worker exception
+            print(f"Created plots for {workload}")
+        else:
+            print(f"Warning: No data for workload {workload}", file=sys.stderr)
+
+    styles = engine_styles(engines, SYSBENCH_LINE_STYLE, ENGINE_LABELS)
+
+    summary_path = output_dir / 'summary_comparison.png'
+    if not needs_rebuild(summary_path, csv_mtime):
+        print("Summary comparison plot is up to date")
+        return
+
+    # Create summary comparison plot; shared x axes take scale and
+    # ticks from the first axes
+    with _figure(ncols=3, figsize=(18, 5), dpi=PNG_DPI, sharex=True,
+                 constrained_layout=True) as (fig, axes):
+        axes[0].set_xscale('log', base=2)
+        fig.supxlabel('Threads', fontsize=10)
+
+        for ax, workload in zip(axes, workloads[:3]):  # Plot first 3 workloads
+            ax.set_title(f'{workload}', fontsize=11)
+            engine_dfs = workload_engine_dfs(workload)
+            if not engine_dfs:
+                ax.text(0.5, 0.5, 'No data', ha='center', va='center',
+                        transform=ax.transAxes)
+                continue
+
+            for engine, engine_df in engine_dfs.items():
+                x = engine_df['threads'].to_numpy()
+                y = engine_df['tps'].to_numpy()
+                ax.plot(x, y, **styles[engine])
+
+            ax.set_ylabel('TPS', fontsize=10)
+            ax.legend(fontsize=9)
+            ax.grid(True, alpha=0.3)
 
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/summary_comparison.png", dpi=300)
-    plt.close()
+        save_png(fig, summary_path)
 
     print(f"Created summary comparison plot")
 
-def plot_tpcc(csv_file, output_dir):
+def plot_tpcc(df, output_dir, csv_mtime=None):
     """Plot TPC-C results"""
-    df = pd.read_csv(csv_file)
-
-    # Handle both engine naming conventions
-    engine_map = {
-        'vanilla-innodb': 'Vanilla InnoDB',
-        'percona-innodb': 'Percona InnoDB',
-        'percona-myrocks': 'Percona MyRocks',
-        'innodb': 'InnoDB',
-        'myrocks': 'MyRocks'
-    }
+    per_engine = engine_arrays(df)
+    engines = df['engine'].unique()
+
+    styles = engine_styles(engines, LINE_STYLE, ENGINE_LABELS)
+    innodb_engine, myrocks_engine = _speedup_engines(engines)
+
+    # Charts that apply to this data; speedup needs an InnoDB/MyRocks pair
+    # and latency charts need valid (not all zero) latency data
+    paths = {'tpmC': output_dir / 'tpcc_tpmC.png'}
+    if innodb_engine and myrocks_engine:
+        paths['speedup'] = output_dir / 'tpcc_speedup.png'
+    for col in ['latency_avg', 'latency_95']:
+        if col in df.columns and df[col].sum() > 0:
+            paths[col] = output_dir / f"tpcc_{col}.png"
+
+    stale = _stale_charts(paths, csv_mtime)
+    if not stale:
+        print("TPC-C plots are up to date")
+        return
+
+    # Figure is reused for every chart below; PNG encoding of each chart
+    # overlaps with drawing the next one
+    encoded = []
+    with ThreadPoolExecutor() as encoder, \
+            _figure(figsize=(12, 6), dpi=PNG_DPI, constrained_layout=True) as (fig, ax):
+        # Plot TpmC
+        if 'tpmC' in stale:
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['tpmC'], **styles[engine])
 
-    # Plot TpmC
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    for engine in df['engine'].unique():
-        engine_df = df[df['engine'] == engine]
-        label = engine_map.get(engine, engine.upper())
-        ax.plot(engine_df['threads'], engine_df['tpmC'],
-               marker='o', label=label, linewidth=2, markersize=8)
-
-    ax.set_xlabel('Threads', fontsize=12)
-    ax.set_ylabel('TpmC (Transactions per Minute)', fontsize=12)
-    ax.set_title('TPC-C Performance Comparison', fontsize=14)
-    ax.legend(fontsize=11)
-    ax.grid(True, alpha=0.3)
-    ax.set_xscale('log', base=2)
-
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/tpcc_tpmC.png", dpi=300)
-    plt.close()
-
-    # Plot speedup (if exactly 2 engines for pairwise comparison)
-    unique_engines = df['engine'].unique()
-    if len(unique_engines) == 2:
-        innodb_engine = None
-        myrocks_engine = None
-
-        for engine in unique_engines:
-            if 'innodb' in engine:
-                innodb_engine = engine
-            elif 'myrocks' in engine:
-                myrocks_engine = engine
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('TpmC (Transactions per Minute)', fontsize=12)
+            ax.set_title('TPC-C Performance Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
 
-        if innodb_engine and myrocks_engine:
-            innodb_df = df[df['engine'] == innodb_engine].set_index('threads')
-            myrocks_df = df[df['engine'] == myrocks_engine].set_index('threads')
+            encoded.append(save_png_async(encoder, fig, stale['tpmC']))
 
-            speedup = myrocks_df['tpmC'] / innodb_df['tpmC']
+        # Plot speedup (pairwise InnoDB vs MyRocks comparison)
+        if 'speedup' in stale:
+            # One reshape to threads x engine, then a column-wise divide;
+            # repeated (engine, threads) rows are averaged
+            piv = df.pivot_table(index='threads', columns='engine', values='tpmC',
+                                 aggfunc='mean', observed=True)
+            speedup = piv[myrocks_engine] / piv[innodb_engine]
 
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(speedup.index, speedup.values, marker='o', linewidth=2, markersize=8, color='green')
+            ax.cla()
+            ax.plot(speedup.index.to_numpy(), speedup.to_numpy(), **LINE_STYLE, color='green')
             ax.axhline(y=1.0, color='r', linestyle='--', label='Equal Performance')
 
             ax.set_xlabel('Threads', fontsize=12)
@@ -147,22 +365,14 @@ def plot_tpcc(csv_file, output_dir):
             ax.grid(True, alpha=0.3)
             ax.set_xscale('log', base=2)
 
-            plt.tight_layout()
-            plt.savefig(f"{output_dir}/tpcc_speedup.png", dpi=300)
-            plt.close()
+            encoded.append(save_png_async(encoder, fig, stale['speedup']))
 
-    # Plot latency if available
-    if 'latency_avg' in df.columns:
-        # Check if there's valid latency data (not all zeros)
-        if df['latency_avg'].sum() > 0:
-            # Plot Average Latency
-            fig, ax = plt.subplots(figsize=(12, 6))
+        # Plot Average Latency
+        if 'latency_avg' in stale:
+            ax.cla()
 
-            for engine in df['engine'].unique():
-                engine_df = df[df['engine'] == engine]
-                label = engine_map.get(engine, engine.upper())
-                ax.plot(engine_df['threads'], engine_df['latency_avg'],
-                       marker='o', label=label, linewidth=2, markersize=8)
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['latency_avg'], **styles[engine])
 
             ax.set_xlabel('Threads', fontsize=12)
             ax.set_ylabel('Average Latency (ms)', fontsize=12)
@@ -171,21 +381,14 @@ def plot_tpcc(csv_file, output_dir):
             ax.grid(True, alpha=0.3)
             ax.set_xscale('log', base=2)
 
-            plt.tight_layout()
-            plt.savefig(f"{output_dir}/tpcc_latency_avg.png", dpi=300)
-            plt.close()
+            encoded.append(save_png_async(encoder, fig, stale['latency_avg']))
 
-    if 'latency_95' in df.columns:
-        # Check if there's valid latency data (not all zeros)
-        if df['latency_95'].sum() > 0:
-            # Plot 95th Percentile Latency
-            fig, ax = plt.subplots(figsize=(12, 6))
+        # Plot 95th Percentile Latency
+        if 'latency_95' in stale:
+            ax.cla()
 
-            for engine in df['engine'].unique():
-                engine_df = df[df['engine'] == engine]
-                label = engine_map.get(engine, engine.upper())
-                ax.plot(engine_df['threads'], engine_df['latency_95'],
-                       marker='o', label=label, linewidth=2, markersize=8)
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['latency_95'], **styles[engine])
 
             ax.set_xlabel('Threads', fontsize=12)
             ax.set_ylabel('95th Percentile Latency (ms)', fontsize=12)
@@ -194,111 +397,100 @@ def plot_tpcc(csv_file, output_dir):
             ax.grid(True, alpha=0.3)
             ax.set_xscale('log', base=2)
 
-            plt.tight_layout()
-            plt.savefig(f"{output_dir}/tpcc_latency_95.png", dpi=300)
-            plt.close()
+            encoded.append(save_png_async(encoder, fig, stale['latency_95']))
 
-    print(f"Created TPC-C plots")
+    for future in encoded:
+        future.result()  # Re-raise any encoding error
+    print(f"Created TPC-C plots: {', '.join(path.name for path in stale.values())}")
 
-def plot_sysbench_tpcc(csv_file, output_dir):
+def plot_sysbench_tpcc(df, output_dir, csv_mtime=None):
     """Plot sysbench-tpcc results (hybrid metrics)"""
-    df = pd.read_csv(csv_file)
-
-    # Plot TpmC comparison
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    # Handle both engine naming conventions
-    engine_map = {
-        'vanilla-innodb': 'Vanilla InnoDB',
-        'percona-innodb': 'Percona InnoDB',
-        'percona-myrocks': 'Percona MyRocks',
-        'innodb': 'InnoDB',
-        'myrocks': 'MyRocks'
+    per_engine = engine_arrays(df)
+    engines = df['engine'].unique()
+
+    styles = engine_styles(engines, LINE_STYLE, ENGINE_LABELS)
+    innodb_engine, myrocks_engine = _speedup_engines(engines)
+
+    # Charts that apply to this data; speedup needs an InnoDB/MyRocks pair
+    paths = {
+        'tpmC': output_dir / 'tpmC_comparison.png',
+        'tps': output_dir / 'tps_comparison.png',
+        'latency': output_dir / 'latency_comparison.png',
     }
+    if innodb_engine and myrocks_engine:
+        paths['speedup'] = output_dir / 'speedup_comparison.png'
+
+    stale = _stale_charts(paths, csv_mtime)
+    if not stale:
+        print("Sysbench-tpcc plots are up to date")
+        return
+
+    # Figure is reused for every chart below; PNG encoding of each chart
+    # overlaps with drawing the next one
+    encoded = []
+    with ThreadPoolExecutor() as encoder, \
+            _figure(figsize=(12, 6), dpi=PNG_DPI, constrained_layout=True) as (fig, ax):
+        # Plot TpmC comparison
+        if 'tpmC' in stale:
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['tpmC'], **styles[engine])
 
-    for engine in df['engine'].unique():
-        engine_df = df[df['engine'] == engine]
-        label = engine_map.get(engine, engine.upper())
-        ax.plot(engine_df['threads'], engine_df['tpmC'],
-               marker='o', label=label, linewidth=2, markersize=8)
-
-    ax.set_xlabel('Threads', fontsize=12)
-    ax.set_ylabel('TpmC (Transactions per Minute)', fontsize=12)
-    ax.set_title('Sysbench-TPCC TpmC Comparison', fontsize=14)
-    ax.legend(fontsize=11)
-    ax.grid(True, alpha=0.3)
-    ax.set_xscale('log', base=2)
-
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/tpmC_comparison.png", dpi=300)
-    plt.close()
-
-    # Plot TPS comparison
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    for engine in df['engine'].unique():
-        engine_df = df[df['engine'] == engine]
-        label = engine_map.get(engine, engine.upper())
-        ax.plot(engine_df['threads'], engine_df['tps'],
-               marker='o', label=label, linewidth=2, markersize=8)
-
-    ax.set_xlabel('Threads', fontsize=12)
-    ax.set_ylabel('TPS (Transactions per Second)', fontsize=12)
-    ax.set_title('Sysbench-TPCC TPS Comparison', fontsize=14)
-    ax.legend(fontsize=11)
-    ax.grid(True, alpha=0.3)
-    ax.set_xscale('log', base=2)
-
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/tps_comparison.png", dpi=300)
-    plt.close()
-
-    # Plot Latency comparison
-    fig, ax = plt.subplots(figsize=(12, 6))
-
-    for engine in df['engine'].unique():
-        engine_df = df[df['engine'] == engine]
-        label = engine_map.get(engine, engine.upper())
-        ax.plot(engine_df['threads'], engine_df['latency_avg'],
-               marker='o', label=label, linewidth=2, markersize=8)
-
-    ax.set_xlabel('Threads', fontsize=12)
-    ax.set_ylabel('Average Latency (ms)', fontsize=12)
-    ax.set_title('Sysbench-TPCC Latency Comparison', fontsize=14)
-    ax.legend(fontsize=11)
-    ax.grid(True, alpha=0.3)
-    ax.set_xscale('log', base=2)
-    ax.set_yscale('log')
-
-    plt.tight_layout()
-    plt.savefig(f"{output_dir}/latency_comparison.png", dpi=300)
-    plt.close()
-
-    # Plot speedup (if exactly 2 engines for pairwise comparison)
-    unique_engines = df['engine'].unique()
-    if len(unique_engines) == 2:
-        # Identify which is innodb and which is myrocks
-        innodb_engine = None
-        myrocks_engine = None
-
-        for engine in unique_engines:
-            if 'innodb' in engine:
-                innodb_engine = engine
-            elif 'myrocks' in engine:
-                myrocks_engine = engine
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('TpmC (Transactions per Minute)', fontsize=12)
+            ax.set_title('Sysbench-TPCC TpmC Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
+
+            encoded.append(save_png_async(encoder, fig, stale['tpmC']))
+
+        # Plot TPS comparison
+        if 'tps' in stale:
+            ax.cla()
+
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['tps'], **styles[engine])
+
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('TPS (Transactions per Second)', fontsize=12)
+            ax.set_title('Sysbench-TPCC TPS Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
+
+            encoded.append(save_png_async(encoder, fig, stale['tps']))
 
-        if innodb_engine and myrocks_engine:
-            innodb_df = df[df['engine'] == innodb_engine].set_index('threads')
-            myrocks_df = df[df['engine'] == myrocks_engine].set_index('threads')
+        # Plot Latency comparison
+        if 'latency' in stale:
+            ax.cla()
 
-            speedup_tpmC = myrocks_df['tpmC'] / innodb_df['tpmC']
-            speedup_tps = myrocks_df['tps'] / innodb_df['tps']
+            for engine, cols in per_engine.items():
+                ax.plot(cols['threads'], cols['latency_avg'], **styles[engine])
 
-            fig, ax = plt.subplots(figsize=(12, 6))
-            ax.plot(speedup_tpmC.index, speedup_tpmC.values,
-                   marker='o', linewidth=2, markersize=8, label='TpmC Speedup')
-            ax.plot(speedup_tps.index, speedup_tps.values,
-                   marker='s', linewidth=2, markersize=8, label='TPS Speedup')
+            ax.set_xlabel('Threads', fontsize=12)
+            ax.set_ylabel('Average Latency (ms)', fontsize=12)
+            ax.set_title('Sysbench-TPCC Latency Comparison', fontsize=14)
+            ax.legend(fontsize=11)
+            ax.grid(True, alpha=0.3)
+            ax.set_xscale('log', base=2)
+            ax.set_yscale('log')
+
+            encoded.append(save_png_async(encoder, fig, stale['latency']))
+
+        # Plot speedup (pairwise InnoDB vs MyRocks comparison)
+        if 'speedup' in stale:
+            # One reshape to threads x engine, then column-wise divides;
+            # repeated (engine, threads) rows are averaged
+            piv = df.pivot_table(index='threads', columns='engine', values=['tpmC', 'tps'],
+                                 aggfunc='mean', observed=True)
+            speedup_tpmC = piv['tpmC'][myrocks_engine] / piv['tpmC'][innodb_engine]
+            speedup_tps = piv['tps'][myrocks_engine] / piv['tps'][innodb_engine]
+
+            ax.cla()
+            ax.plot(speedup_tpmC.index.to_numpy(), speedup_tpmC.to_numpy(),
+                   **LINE_STYLE, label='TpmC Speedup')
+            ax.plot(speedup_tps.index.to_numpy(), speedup_tps.to_numpy(),
+                   **{**LINE_STYLE, 'marker': 's'}, label='TPS Speedup')
             ax.axhline(y=1.0, color='r', linestyle='--', label='Equal Performance')
 
             ax.set_xlabel('Threads', fontsize=12)
@@ -308,40 +500,95 @@ def plot_sysbench_tpcc(csv_file, output_dir):
             ax.grid(True, alpha=0.3)
             ax.set_xscale('log', base=2)
 
-            plt.tight_layout()
-            plt.savefig(f"{output_dir}/speedup_comparison.png", dpi=300)
-            plt.close()
+            encoded.append(save_png_async(encoder, fig, stale['speedup']))
+
+    for future in encoded:
+        future.result()  # Re-raise any encoding error
+    print(f"Created sysbench-tpcc plots: {', '.join(path.name for path in stale.values())}")
+
+def detect_benchmark(csv_file):
+    """Infer the benchmark type from a merged_results.csv header
 
-    print(f"Created sysbench-tpcc plots")
+    Returns None for CSVs this script does not plot (e.g. TPC-H, ClickBench).
+    """
+    with open(csv_file) as f:
+        columns = set(f.readline().strip().split(','))
+
+    if 'workload' in columns:
+        return 'sysbench'
+    if {'tpmC', 'tps'} <= columns:
+        return 'sysbench-tpcc'
+    if 'tpmC' in columns:
+        return 'tpcc'
+    return None
+
+def plot_benchmark(benchmark, csv_file, output_dir, incremental=False):
+    """Load one merged_results.csv and render its plots into output_dir"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Plotting {benchmark} results from {csv_file}")
+    print(f"Output directory: {output_dir}")
+
+    df = load_results(csv_file)
+    csv_mtime = Path(csv_file).stat().st_mtime if incremental else None
+
+    if benchmark == 'sysbench':
+        plot_sysbench(df, output_dir, csv_mtime)
+    elif benchmark == 'tpcc':
+        plot_tpcc(df, output_dir, csv_mtime)
+    elif benchmark == 'sysbench-tpcc':
+        plot_sysbench_tpcc(df, output_dir, csv_mtime)
+
+    print(f"Plots saved to {output_dir}")
 
 def main():
     parser = argparse.ArgumentParser(description='Plot benchmark results')
-    parser.add_argument('benchmark', choices=['sysbench', 'tpcc', 'sysbench-tpcc'],
-                       help='Benchmark type')
-    parser.add_argument('csv_file', help='Path to merged_results.csv')
+    parser.add_argument('benchmark', choices=['sysbench', 'tpcc', 'sysbench-tpcc', 'all'],
+                       help='Benchmark type; "all" plots every merged_results.csv '
+                            'found under a directory in one run')
+    parser.add_argument('csv_file',
+                       help='Path to merged_results.csv (a directory for "all")')
     parser.add_argument('-o', '--output', default='.',
                        help='Output directory for plots')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Skip plots whose PNG is newer than the CSV file')
 
     args = parser.parse_args()
 
-    if not Path(args.csv_file).exists():
-        print(f"Error: CSV file not found: {args.csv_file}", file=sys.stderr)
-        sys.exit(1)
-
     output_dir = Path(args.output)
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    print(f"Plotting {args.benchmark} results from {args.csv_file}")
-    print(f"Output directory: {output_dir}")
+    if args.benchmark != 'all':
+        if not Path(args.csv_file).exists():
+            print(f"Error: CSV file not found: {args.csv_file}", file=sys.stderr)
+            sys.exit(1)
 
-    if args.benchmark == 'sysbench':
-        plot_sysbench(args.csv_file, output_dir)
-    elif args.benchmark == 'tpcc':
-        plot_tpcc(args.csv_file, output_dir)
-    elif args.benchmark == 'sysbench-tpcc':
-        plot_sysbench_tpcc(args.csv_file, output_dir)
+        plot_benchmark(args.benchmark, args.csv_file, output_dir, args.incremental)
+        return
 
-    print(f"Plots saved to {output_dir}")
+    # Plot every comparison under the directory in this process, so the
+    # pandas/matplotlib imports and font cache load are paid only once.
+    # Output mirrors the input layout, e.g. <output>/tpcc/<timestamp>/.
+    search_dir = Path(args.csv_file)
+    if not search_dir.exists():
+        print(f"Error: Directory not found: {args.csv_file}", file=sys.stderr)
+        sys.exit(1)
+    if not search_dir.is_dir():
+        print(f"Error: 'all' expects a directory: {args.csv_file}", file=sys.stderr)
+        sys.exit(1)
+
+    csv_files = sorted(search_dir.rglob('merged_results.csv'))
+    if not csv_files:
+        print(f"Error: No merged_results.csv found under {search_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    for csv_file in csv_files:
+        benchmark = detect_benchmark(csv_file)
+        if benchmark is None:
+            print(f"Skipping {csv_file}: unsupported benchmark format")
+            continue
+        plot_benchmark(benchmark, csv_file,
+                       output_dir / csv_file.parent.relative_to(search_dir),
+                       args.incremental)
 
 if __name__ == '__main__':
     main()